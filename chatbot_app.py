@@ -4,26 +4,38 @@
 # In[ ]:
 
 
+import os
+import tempfile
 import streamlit as st
 import pandas as pd
 import re
+from types import MappingProxyType
 
 
 # In[ ]:
 
 
 # --- Data Preparation ---
-@st.cache_data
-def load_and_prepare_data(file_path):
+def read_and_clean_csv(file_path):
     """
-    Loads financial data, cleans it, converts types, and calculates growth metrics.
-    Caches the result to avoid re-running on every Streamlit interaction.
+    Reads the financial CSV, cleans it, converts types, and calculates growth metrics.
+    Shows an error and stops the app if the file is missing, unreadable or empty,
+    so a bad result is never cached.
     """
     try:
-        df = pd.read_csv(file_path)
+        # Let the CSV parser strip the thousands separators and surrounding spaces,
+        # so the numeric columns come out as numbers straight away
+        df = pd.read_csv(file_path, thousands=',', skipinitialspace=True)
     except FileNotFoundError:
         st.error(f"Error: The file '{file_path}' was not found. Please ensure it's in the same directory as the app.")
-        return pd.DataFrame() # Return an empty DataFrame on error
+        st.stop() # Stop the app here; nothing below can work without the data
+    except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+        st.error(f"Error: The file '{file_path}' could not be read ({e}). Please check that it contains valid CSV data.")
+        st.stop()
+
+    if df.empty:
+        st.error(f"Error: The file '{file_path}' has no data rows. Please check that it contains the financial data.")
+        st.stop()
 
     # Data Cleaning and Type Conversion 
     # List of columns that should be numeric
@@ -35,67 +47,269 @@ def load_and_prepare_data(file_path):
         'Cash Flow from Operating Activities ($M)'
     ]
 
-    # Apply cleaning and conversion to each numeric column
     for col in numeric_cols:
-        if col in df.columns: # Check if the column exists
-            # Convert to string, remove commas, remove any leading/trailing spaces, then convert to numeric
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '').str.strip(), errors='coerce')
-        else:
+        if col not in df.columns: # Check if the column exists
             print(f"Warning: Column '{col}' not found in DataFrame. Please check your CSV header names.")
+    numeric_cols = [col for col in numeric_cols if col in df.columns]
+
+    # Any column still read as text has stray characters in it, and the parser leaves the
+    # thousands separators in all of its values. Strip commas and spaces, then convert, so
+    # only the bad cells become NaN rather than the whole column.
+    text_cols = [col for col in numeric_cols if not pd.api.types.is_numeric_dtype(df[col])]
+    if text_cols:
+        df[text_cols] = df[text_cols].apply(
+            lambda s: pd.to_numeric(s.str.replace(r'[,\s]', '', regex=True), errors='coerce')
+        )
+
+    # Company has only a handful of distinct names, so store it as a category (small integer
+    # codes the groupby can use directly) and keep the years as small integers.
+    # Rows without a usable fiscal year can't be placed in a company's history, so they are dropped.
+    df['Fiscal Year'] = pd.to_numeric(df['Fiscal Year'], errors='coerce')
+    bad_years = df['Fiscal Year'].isna()
+    if bad_years.any():
+        print(f"Warning: Skipping {bad_years.sum()} row(s) with a missing or invalid 'Fiscal Year' in '{file_path}'.")
+        df = df[~bad_years].copy()
+        if df.empty:
+            st.error(f"Error: The file '{file_path}' has no rows with a valid 'Fiscal Year'. Please check the data.")
+            st.stop()
+    df['Company'] = df['Company'].astype('category')
+    df['Fiscal Year'] = df['Fiscal Year'].astype('int16')
 
     # Sort data before calculating percentage change 
     # Ensure 'Fiscal Year' is sorted correctly for pct_change to work across years within each company
     df = df.sort_values(by=['Company', 'Fiscal Year'])
 
-    # Calculate year-over-year changes 
-    df['Revenue Growth (%)'] = df.groupby('Company')['Total Revenue ($M)'].pct_change() * 100
-    df['Net Income Growth (%)'] = df.groupby('Company')['Net Income ($M)'].pct_change() * 100
-    df['Total Assets Growth (%)'] = df.groupby('Company')['Total Assets ($M)'].pct_change() * 100
-    df['Total Liabilities Growth (%)'] = df.groupby('Company')['Total Liabilities ($M)'].pct_change() * 100
-    df['Cash Flow from Operating Activities Growth (%)'] = df.groupby('Company')['Cash Flow from Operating Activities ($M)'].pct_change() * 100
-
-    # Fill NA values that result from pct_change calculations with 0 or an appropriate value
-    df.fillna(0, inplace=True)
+    # Calculate year-over-year changes for every numeric column in one grouped pass.
+    # The data is already sorted, so the groupby doesn't need to sort the companies again.
+    growth_names = {
+        'Total Revenue ($M)': 'Revenue Growth (%)',
+        'Net Income ($M)': 'Net Income Growth (%)',
+        'Total Assets ($M)': 'Total Assets Growth (%)',
+        'Total Liabilities ($M)': 'Total Liabilities Growth (%)',
+        'Cash Flow from Operating Activities ($M)': 'Cash Flow from Operating Activities Growth (%)'
+    }
+    growth = df.groupby('Company', sort=False, observed=True)[numeric_cols].pct_change() * 100
+    growth.columns = [growth_names[col] for col in numeric_cols]
+    df[growth.columns] = growth
+
+    # Growth is left as NaN where there's no previous year to compare against.
+    # A matching 'Available' column (e.g. 'Revenue Growth Available') records whether it exists,
+    # so the chatbot can check a plain True/False instead of testing for NaN on every query.
+    available = growth.notna()
+    available.columns = [col.replace(' (%)', ' Available') for col in growth.columns]
+    df[available.columns] = available
+
+    # Fill NA values left by the numeric conversion with 0
+    df[numeric_cols] = df[numeric_cols].fillna(0)
     return df
 
 
+def build_summary(company, year, row, has_prior):
+    """
+    Writes the financial summary for one company and fiscal year, including the follow-up question.
+    """
+    # It creates a detailed summary response with several key financial points for the year.
+    summary_response = f"Here's a summary of {company}'s financial performance for FY{year}:\n"
+    summary_response += f"- Total Revenue: ${row['Total Revenue ($M)']:,}M\n"
+    summary_response += f"- Net Income: ${row['Net Income ($M)']:,}M\n"
+    summary_response += f"- Cash Flow from Operations: ${row['Cash Flow from Operating Activities ($M)']:,}M\n"
+
+    # It adds growth rates to the summary if they are available for the specific year.
+    # Growth is only available from 2023 onwards in your dataset, as 2022 is the first year.
+    if has_prior and row['Revenue Growth Available'] and row['Net Income Growth Available']:
+        summary_response += f"- Revenue Growth (YoY): {row['Revenue Growth (%)']:.2f}%\n"
+        summary_response += f"- Net Income Growth (YoY): {row['Net Income Growth (%)']:.2f}%\n"
+    else:
+        summary_response += f"Growth data for FY{year} is not available (requires previous year's data in the dataset).\n"
+
+    # After giving a summary, it suggests diving deeper or comparing years.
+    summary_response += "\nIs there a specific metric you'd like to dive deeper into, or perhaps compare another year's performance?"
+    return summary_response
+
+
+@st.cache_resource
+def load_and_prepare_data(file_path):
+    """
+    Loads the prepared financial data and builds the lookup tables the chatbot answers from.
+    Caches the result to avoid re-running on every Streamlit interaction. The cached
+    objects are handed back as-is on every rerun (not copied), so treat them as read-only.
+    The prepared data is also saved next to the CSV as a Parquet file, so later
+    app restarts can skip the CSV parsing and cleaning as long as the CSV hasn't changed.
+
+    Returns a tuple of (DataFrame, {(company, year): row}, {company: latest year's row},
+    {company: whether it has more than one year of data}, {(company, year): summary text}).
+    """
+    parquet_path = os.path.splitext(file_path)[0] + '.parquet'
+
+    # Reuse the prepared Parquet copy if it's newer than both the CSV it was built from
+    # and this script (a code change may change how the data is prepared)
+    df = None
+    if (os.path.exists(parquet_path) and os.path.exists(file_path)
+            and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path)
+            and os.path.getmtime(parquet_path) >= os.path.getmtime(__file__)):
+        try:
+            df = pd.read_parquet(parquet_path)
+        except (ImportError, OSError, ValueError) as e:
+            # A damaged Parquet file is rebuilt from the CSV below
+            print(f"Warning: Could not read '{parquet_path}' ({e}). Rebuilding it from the CSV.")
+
+    if df is None:
+        df = read_and_clean_csv(file_path)
+
+        # Save the prepared data so the next cold start can load it directly.
+        # It's written to a temporary file first and then moved into place, so a crash or
+        # another app process writing at the same time can never leave a half-written file.
+        temp_path = None
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(suffix='.parquet', dir=os.path.dirname(parquet_path) or '.')
+            os.close(temp_fd)
+            df.to_parquet(temp_path, engine='pyarrow', compression='zstd')
+            os.replace(temp_path, parquet_path)
+        except (ImportError, OSError) as e:
+            print(f"Warning: Could not write '{parquet_path}' ({e}). The CSV will be parsed again next time.")
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # Build the lookup tables once here, so answering a query is just a dictionary lookup
+    # instead of filtering the whole table every time.
+    # They are shared by every session through st.cache_resource, so they're wrapped in
+    # read-only views to stop one session from changing the data another one sees.
+    records = df.to_dict('records')
+    lookup = MappingProxyType({(row['Company'], int(row['Fiscal Year'])): MappingProxyType(row) for row in records})
+    latest_year = df.sort_values('Fiscal Year').groupby('Company', observed=True)['Fiscal Year'].last().astype(int)
+    latest_row = MappingProxyType({company: lookup[(company, int(year))] for company, year in latest_year.items()})
+    # Growth needs a previous year, so note which companies have more than one year of data
+    has_prior = MappingProxyType(
+        {company: count > 1 for company, count in df.groupby('Company', observed=True).size().items()}
+    )
+    # There are only a few company/year pairs, so every summary is written out up front
+    summaries = MappingProxyType(
+        {(company, year): build_summary(company, year, row, has_prior[company]) for (company, year), row in lookup.items()}
+    )
+    return df, lookup, latest_row, has_prior, summaries
+
+
 # In[ ]:
 
 
 # --- Chatbot Logic ---
-def get_financial_insight(query, financial_df):
+# Patterns used to pick out the company and the metrics in a query. They are compiled once
+# here so each query is scanned in a single pass instead of one 'in' check per keyword.
+_COMPANY_RE = re.compile(r'\b(microsoft|tesla|apple)')
+# Pattern specifically for 2022, 2023, 2024. '\b' ensures it matches whole words
+# (e.g., '2022' not just part of 'something2022').
+_YEAR_RE = re.compile(r'\b(202[2-4])\b')
+
+# Each phrase maps to the metrics it asks for. A growth phrase also asks for the
+# underlying figure, e.g. "revenue growth" answers with both the revenue and its growth.
+_METRIC_PHRASES = {
+    'revenue growth': ('revenue', 'revenue_growth'),
+    'net income growth': ('net_income', 'net_income_growth'),
+    'profit growth': ('net_income', 'net_income_growth'),
+    'assets growth': ('assets', 'assets_growth'),
+    'liabilities growth': ('liabilities', 'liabilities_growth'),
+    'cash flow growth': ('cash_flow', 'cash_flow_growth'),
+    'revenue': ('revenue',),
+    'net income': ('net_income',),
+    'profit': ('net_income',),
+    'assets': ('assets',),
+    'liabilities': ('liabilities',),
+    'cash flow': ('cash_flow',),
+}
+# Longer phrases come first in the alternation so "revenue growth" wins over "revenue".
+_METRIC_RE = re.compile(r'\b(' + '|'.join(sorted(_METRIC_PHRASES, key=len, reverse=True)) + ')')
+
+# Keywords that ask for a summary. They are matched anywhere in the query.
+_SUMMARY_KEYWORDS = ('summarise', 'performance', 'overview', 'financial health')
+
+# Quick check for anything the chatbot could answer, built from the same lists the detailed
+# checks use: the first word of every metric phrase (anchored at the start of a word, like
+# _METRIC_RE) and every summary keyword (matched anywhere). Anything _METRIC_RE or the
+# summary check would match also contains one of these, so a query this doesn't match
+# gets the help message straight away.
+_QUERY_TRIGGER_RE = re.compile(
+    r'\b(?:' + '|'.join(sorted({phrase.split()[0] for phrase in _METRIC_PHRASES})) + ')|'
+    + '|'.join(_SUMMARY_KEYWORDS)
+)
+
+# Reply used when the query doesn't ask for anything the chatbot can answer.
+_UNKNOWN_QUERY_TEMPLATE = (
+    "I'm not sure how to answer that about {company}. "
+    "I can tell you about its total revenue, net income, assets, liabilities, cash flow, or their growth rates. "
+    "Try asking 'What is Microsoft's revenue for 2023?' or 'Summarise Apple's performance for 2022'."
+)
+
+# Response templates for each metric, filled in with str.format_map on the selected row.
+# They are listed in the order the answers appear in the response.
+_FIGURE_TEMPLATES = {
+    'revenue': "{company}'s Total Revenue for FY{year} was ${Total Revenue ($M):,.0f}M.",
+    'net_income': "{company}'s Net Income for FY{year} was ${Net Income ($M):,.0f}M.",
+    'assets': "{company}'s Total Assets for FY{year} were ${Total Assets ($M):,.0f}M.",
+    'liabilities': "{company}'s Total Liabilities for FY{year} were ${Total Liabilities ($M):,.0f}M.",
+    'cash_flow': "{company}'s Cash Flow from Operating Activities for FY{year} was ${Cash Flow from Operating Activities ($M):,.0f}M.",
+}
+# Growth metrics: (availability column, template, template used when the growth is missing).
+_GROWTH_TEMPLATES = {
+    'revenue_growth': (
+        'Revenue Growth Available',
+        "{company}'s Revenue Growth for FY{year} was {Revenue Growth (%):.2f}%.",
+        "{company}'s Revenue Growth data for FY{year} is not available (requires previous year's data)."
+    ),
+    'net_income_growth': (
+        'Net Income Growth Available',
+        "{company}'s Net Income Growth for FY{year} was {Net Income Growth (%):.2f}%.",
+        "{company}'s Net Income Growth data for FY{year} is not available (requires previous year's data)."
+    ),
+    'assets_growth': (
+        'Total Assets Growth Available',
+        "{company}'s Total Assets Growth for FY{year} was {Total Assets Growth (%):.2f}%.",
+        "{company}'s Total Assets Growth data for FY{year} is not available (requires previous year's data)."
+    ),
+    'liabilities_growth': (
+        'Total Liabilities Growth Available',
+        "{company}'s Total Liabilities Growth for FY{year} was {Total Liabilities Growth (%):.2f}%.",
+        "{company}'s Total Liabilities Growth data for FY{year} is not available (requires previous year's data)."
+    ),
+    'cash_flow_growth': (
+        'Cash Flow from Operating Activities Growth Available',
+        "{company}'s Cash Flow from Operating Activities Growth for FY{year} was {Cash Flow from Operating Activities Growth (%):.2f}%.",
+        "{company}'s Cash Flow from Operating Activities Growth data for FY{year} is not available (requires previous year's data)."
+    ),
+}
+
+
+def get_financial_insight(query, lookup, latest_row, has_prior, summaries):
     """
     Processes a user query about financial data using rule-based logic and adds
     interactive suggestions for follow-up questions.
+    'lookup', 'latest_row', 'has_prior' and 'summaries' are the lookup tables built by load_and_prepare_data.
     """
     query = query.lower() # Convert query to lowercase for case-insensitive matching
 
     # --- 1. Identify Company ---
     # The assistant first tries to figure out which company you're asking about.
-    company = None # Starts by assuming no company is identified yet.
-    if "microsoft" in query:
-        company = "Microsoft"
-    elif "tesla" in query:
-        company = "Tesla"
-    elif "apple" in query:
-        company = "Apple"
+    company_match = _COMPANY_RE.search(query)
+    company = company_match.group(1).title() if company_match else None
 
     if not company:
         return "I need a company name (Microsoft, Tesla, or Apple) to provide financial insights. Please try again."
 
-    # Now that it knows the company, it goes to your big data table ('financial_df')
-    # and pulls out *only* the rows that belong to that specific company.
-    company_data = financial_df[financial_df['Company'] == company]
-    if company_data.empty:
+    # Now that it knows the company, it checks that the data table has rows for it.
+    if company not in latest_row:
         return f"No data available for **{company}**. Please check the company name or the dataset."
 
+    # Quick check before any detailed matching: if none of the query's words can start a
+    # metric or summary request, there's nothing to look up.
+    if not _QUERY_TRIGGER_RE.search(query):
+        return _UNKNOWN_QUERY_TEMPLATE.format(company=company)
+
 
     # --- 2. Identify Specific Year in Query ---
     requested_year = None
-    # This line uses a regular expression (re) to look for a four-digit number
+    # This line uses a regular expression (_YEAR_RE) to look for a four-digit number
     # that matches the years 2022, 2023, or 2024 within your question.
-    # '\b' ensures it matches whole words (e.g., '2022' not just part of 'something2022').
-    year_match = re.search(r'\b(202[2-4])\b', query) # Pattern specifically for 2022, 2023, 2024
+    year_match = _YEAR_RE.search(query)
     if year_match:
         # If a year is found, it converts it to a number.
         requested_year = int(year_match.group(1))
@@ -104,121 +318,56 @@ def get_financial_insight(query, financial_df):
     selected_year_data = None
     actual_year_used = None # This variable will store the year that the chatbot actually uses for its response.
 
-    # Initialise response_parts here to ensure it always exists
+    # All parts of the response are collected in this one list and joined at the end.
     response_parts = []
     
     # If a specific year was asked for AND that year exists for the company in the data:
-    if requested_year and requested_year in company_data['Fiscal Year'].values:
+    if requested_year and (company, requested_year) in lookup:
         # It picks the row that matches the exact requested year.
-        selected_year_data = company_data[company_data['Fiscal Year'] == requested_year].iloc[0]
+        selected_year_data = lookup[(company, requested_year)]
         actual_year_used = requested_year # The year used is the requested year.
     else:
         # If no year was asked for, or the requested year isn't in the data for that company,
-        # it defaults to using the data from the latest available year (.iloc[-1]).
-        selected_year_data = company_data.iloc[-1]
-        actual_year_used = selected_year_data['Fiscal Year'] # The year used is the latest year.
+        # it defaults to using the data from the latest available year.
+        selected_year_data = latest_row[company]
+        actual_year_used = int(selected_year_data['Fiscal Year']) # The year used is the latest year.
         
-        # If a year was requested but not found, it adds a polite message to the response.
+        # If a year was requested but not found, it starts the response with a polite message.
         if requested_year:
-            response_parts = [f"I couldn't find data for {company} in FY{requested_year}. Displaying data for FY{actual_year_used} instead. "]
-        else:
-            # If no specific year was requested, start with an empty list for response parts.
-            response_parts = []
-
-    # Use selected_year_data instead of latest_year_data for all metric lookups from now on.
-    response_parts_temp = [] # A temporary list to build the main part of the response.
-    metric_found = False # A flag to track if any specific metric was found in the query.
-    
+            response_parts.append(f"I couldn't find data for {company} in FY{requested_year}. Displaying data for FY{actual_year_used} instead. ")
+
+    # If you asked for a summary, performance, or overview, it returns the summary prepared
+    # for the actual year used (it was already written out when the data was loaded).
+    if any(keyword in query for keyword in _SUMMARY_KEYWORDS):
+        return summaries[(company, actual_year_used)]
+
     # --- 4. Identify Metric and Construct Response ---
     # This section checks what specific financial number or growth rate you're asking for.
+    metrics = set()
+    for metric_match in _METRIC_RE.finditer(query):
+        metrics.update(_METRIC_PHRASES[metric_match.group(1)])
+
+    # The templates are filled straight from the selected row, plus the company and year.
+    row = dict(selected_year_data, company=company, year=actual_year_used)
 
     # Check for absolute financial numbers (like total revenue, net income, etc.)
-    if "total revenue" in query or "revenue" in query:
-        value = selected_year_data['Total Revenue ($M)']
-        response_parts_temp.append(f"{company}'s Total Revenue for FY{actual_year_used} was ${value:,.0f}M.")
-        metric_found = True
-    if "net income" in query or "profit" in query:
-        value = selected_year_data['Net Income ($M)']
-        response_parts_temp.append(f"{company}'s Net Income for FY{actual_year_used} was ${value:,.0f}M.")
-        metric_found = True
-    if "total assets" in query or "assets" in query:
-        value = selected_year_data['Total Assets ($M)']
-        response_parts_temp.append(f"{company}'s Total Assets for FY{actual_year_used} were ${value:,.0f}M.")
-        metric_found = True
-    if "total liabilities" in query or "liabilities" in query:
-        value = selected_year_data['Total Liabilities ($M)']
-        response_parts_temp.append(f"{company}'s Total Liabilities for FY{actual_year_used} were ${value:,.0f}M.")
-        metric_found = True
-    if "cash flow from operating activities" in query or "operating cash flow" in query or "cash flow" in query:
-        value = selected_year_data['Cash Flow from Operating Activities ($M)']
-        response_parts_temp.append(f"{company}'s Cash Flow from Operating Activities for FY{actual_year_used} was ${value:,.0f}M.")
-        metric_found = True
+    for metric, template in _FIGURE_TEMPLATES.items():
+        if metric in metrics:
+            response_parts.append(template.format_map(row))
 
     # Check for growth rates.
     # Growth percentages are always relative to the previous year available.
     # In our data, 2022 won't have growth, as there's no 2021 in the dataset.
-    if len(company_data) > 1: # Only try to get growth if there's enough data for it.
-        if "revenue growth" in query:
-            value = selected_year_data['Revenue Growth (%)']
-            # If the growth value is missing (NaN), it means there's no prior year to calculate from.
-            if pd.isna(value):
-                response_parts_temp.append(f"{company}'s Revenue Growth data for FY{actual_year_used} is not available (requires previous year's data).")
-            else:
-                response_parts_temp.append(f"{company}'s Revenue Growth for FY{actual_year_used} was {value:.2f}%.")
-            metric_found = True
-        if "net income growth" in query or "profit growth" in query:
-            value = selected_year_data['Net Income Growth (%)']
-            if pd.isna(value):
-                 response_parts_temp.append(f"{company}'s Net Income Growth data for FY{actual_year_used} is not available (requires previous year's data).")
-            else:
-                response_parts_temp.append(f"{company}'s Net Income Growth for FY{actual_year_used} was {value:.2f}%.")
-            metric_found = True
-        if "assets growth" in query:
-            value = selected_year_data['Total Assets Growth (%)']
-            if pd.isna(value):
-                response_parts_temp.append(f"{company}'s Total Assets Growth data for FY{actual_year_used} is not available (requires previous year's data).")
-            else:
-                response_parts_temp.append(f"{company}'s Total Assets Growth for FY{actual_year_used} was {value:.2f}%.")
-            metric_found = True
-        if "liabilities growth" in query:
-            value = selected_year_data['Total Liabilities Growth (%)']
-            if pd.isna(value):
-                response_parts_temp.append(f"{company}'s Total Liabilities Growth data for FY{actual_year_used} is not available (requires previous year's data).")
-            else:
-                response_parts_temp.append(f"{company}'s Total Liabilities Growth for FY{actual_year_used} was {value:.2f}%.")
-            metric_found = True
-        if "operating cash flow growth" in query or "cash flow growth" in query:
-            value = selected_year_data['Cash Flow from Operating Activities Growth (%)']
-            if pd.isna(value):
-                response_parts_temp.append(f"{company}'s Cash Flow from Operating Activities Growth data for FY{actual_year_used} is not available (requires previous year's data).")
-            else:
-                response_parts_temp.append(f"{company}'s Cash Flow from Operating Activities Growth for FY{actual_year_used} was {value:.2f}%.")
-            metric_found = True
-
-    # --- 5. Handle General Summaries or Unrecognised Queries & Add Interactivity ---
-
-    # If you asked for a summary, performance, or overview.
-    if "summarise" in query or "performance" in query or "overview" in query or "financial health" in query:
-        # It creates a detailed summary response with several key financial points for the actual year used.
-        summary_response = f"Here's a summary of {company}'s financial performance for FY{actual_year_used}:\n"
-        summary_response += f"- Total Revenue: ${selected_year_data['Total Revenue ($M)']:,}M\n"
-        summary_response += f"- Net Income: ${selected_year_data['Net Income ($M)']:,}M\n"
-        summary_response += f"- Cash Flow from Operations: ${selected_year_data['Cash Flow from Operating Activities ($M)']:,}M\n"
-        
-        # It adds growth rates to the summary if they are available for the specific year.
-        # Growth is only available from 2023 onwards in your dataset, as 2022 is the first year.
-        if actual_year_used in [2023, 2024] and len(company_data) > 1:
-            summary_response += f"- Revenue Growth (YoY): {selected_year_data.get('Revenue Growth (%)', 'N/A'):.2f}%\n"
-            summary_response += f"- Net Income Growth (YoY): {selected_year_data.get('Net Income Growth (%)', 'N/A'):.2f}%\n"
-        else:
-             summary_response += f"Growth data for FY{actual_year_used} is not available (requires previous year's data in the dataset).\n"
-
-        # After giving a summary, it suggests diving deeper or comparing years.
-        summary_response += f"\nIs there a specific metric you'd like to dive deeper into, or perhaps compare another year's performance?"
-        return summary_response
+    if has_prior[company]: # Only try to get growth if there's enough data for it.
+        for metric, (available_column, template, unavailable_template) in _GROWTH_TEMPLATES.items():
+            if metric in metrics:
+                # If the growth value is missing, it means there's no prior year to calculate from.
+                if not row[available_column]:
+                    response_parts.append(unavailable_template.format_map(row))
+                else:
+                    response_parts.append(template.format_map(row))
 
-    # Combine any initial messages (like "year not found") with the metric-specific responses.
-    response_parts.extend(response_parts_temp)
+    # --- 5. Handle Unrecognised Queries & Add Interactivity ---
 
     # If specific metrics were found in the query.
     if response_parts:
@@ -237,15 +386,15 @@ def get_financial_insight(query, financial_df):
         # If the assistant couldn't find any specific metric or a summary request,
         # it gives you a polite message asking you to try rephrasing,
         # and reminds you what it can answer, including specific years.
-        return (f"I'm not sure how to answer that about {company}. "
-                f"I can tell you about its total revenue, net income, assets, liabilities, cash flow, or their growth rates. "
-                f"Try asking 'What is Microsoft's revenue for 2023?' or 'Summarise Apple's performance for 2022'.")
+        return _UNKNOWN_QUERY_TEMPLATE.format(company=company)
 
 
 # In[ ]:
 
 
 # --- Streamlit App Layout ---
+MAX_DISPLAYED_MESSAGES = 50 # How many past chat messages are shown on each rerun
+
 st.set_page_config(page_title="Financial Insights Chatbot", layout="centered")
 
 st.title("💰 Financial Insights Chatbot")
@@ -263,40 +412,41 @@ st.info("💡 **Examples:**\n"
         "- `Tell me about Microsoft's net income growth.`\n"
         "- `Summarise Tesla's performance for 2023.`")
 
-# Load data only once and cache it for efficiency
-df = load_and_prepare_data('financial_data.csv')
-
-if not df.empty:
-    # Initialize chat history in session state
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
-
-    # Display chat messages from history on app rerun
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-
-    # Accept user input
-    user_query = st.chat_input("Your query:")
-
-    if user_query:
-        # Add user message to chat history and display
-        st.session_state.messages.append({"role": "user", "content": user_query})
-        with st.chat_message("user"):
-            st.markdown(user_query)
-
-        # Get chatbot response
-        chatbot_response = get_financial_insight(user_query, df)
-
-        # Add chatbot response to chat history and display
-        st.session_state.messages.append({"role": "assistant", "content": chatbot_response})
-        with st.chat_message("assistant"):
-            st.markdown(chatbot_response)
-
-    st.markdown("---")
-    st.write("Feel free to ask another question or close the tab to end the session.")
-else:
-    st.warning("Please ensure 'financial_data.csv' is correctly placed and contains valid data for the chatbot to function.")
+# Load data only once and cache it for efficiency (the same objects are reused on every rerun).
+# If the data can't be loaded, the app shows an error and stops here.
+df, lookup, latest_row, has_prior, summaries = load_and_prepare_data('financial_data.csv')
+
+# Initialize chat history in session state
+if 'messages' not in st.session_state:
+    st.session_state.messages = []
+
+# Display chat messages from history on app rerun.
+# Only the most recent messages are drawn so a long session doesn't slow down every rerun.
+if len(st.session_state.messages) > MAX_DISPLAYED_MESSAGES:
+    st.caption(f"Showing the last {MAX_DISPLAYED_MESSAGES} messages.")
+for message in st.session_state.messages[-MAX_DISPLAYED_MESSAGES:]:
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+
+# Accept user input
+user_query = st.chat_input("Your query:")
+
+if user_query:
+    # Add user message to chat history and display
+    st.session_state.messages.append({"role": "user", "content": user_query})
+    with st.chat_message("user"):
+        st.markdown(user_query)
+
+    # Get chatbot response
+    chatbot_response = get_financial_insight(user_query, lookup, latest_row, has_prior, summaries)
+
+    # Add chatbot response to chat history and display
+    st.session_state.messages.append({"role": "assistant", "content": chatbot_response})
+    with st.chat_message("assistant"):
+        st.markdown(chatbot_response)
+
+st.markdown("---")
+st.write("Feel free to ask another question or close the tab to end the session.")
 
 
 # In[ ]: